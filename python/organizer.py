@@ -16,8 +16,15 @@
 #
 # ═══════════════════════════════════════════════════════════════════════════════
 
+import errno
+import logging
+import logging.handlers
 import os
+import queue
+import re
 import shutil
+import sys
+import threading
 import time
 from pathlib import Path
 from watchdog.observers import Observer
@@ -43,20 +50,119 @@ PLATFORMS = [
     'youtube', 'snapchat'
 ]
 
+# One compiled pattern validates platform, timestamp, counter and
+# extension in a single C-level scan of the filename. Case-sensitive on
+# purpose: the browser extension writes every filename lowercase, so no
+# per-event normalization is needed
+FILENAME_PAT = re.compile(
+    r'^(' + '|'.join(re.escape(p) for p in PLATFORMS) + r')_\d+_\d+\.(jpg|txt)$'
+)
+
 # File extensions
 IMAGE_EXT = '.jpg'
 LABEL_EXT = '.txt'
 
+# Precomputed destination folders, keyed by (platform, bare suffix) so
+# the suffix captured by FILENAME_PAT can be used as-is - avoids both
+# the os.path.join and a '.'+suffix string build per file event
+DEST_DIRS = {}
+for _platform in PLATFORMS:
+    DEST_DIRS[(_platform, 'jpg')] = os.path.join(DEST_BASE, _platform, 'images')
+    DEST_DIRS[(_platform, 'txt')] = os.path.join(DEST_BASE, _platform, 'labels')
+
+# In-memory file counters, seeded from disk once at startup and then
+# maintained incrementally on every successful move. The lock keeps the
+# read-modify-write increments from the worker threads from losing
+# updates, and gives print_statistics a consistent snapshot
+COUNTS = {_platform: {'images': 0, 'labels': 0} for _platform in PLATFORMS}
+COUNTS_LOCK = threading.Lock()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LOGGING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Per-event messages only enqueue a record here; a background listener
+# thread does the actual stdout writes, keeping stdio off the hot path
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+
+log = logging.getLogger('organizer')
+log.setLevel(logging.INFO)
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # FILE HANDLER CLASS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def _move_across_devices(src, dst):
+    """
+    Copy src to dst on a different filesystem, then remove src
+
+    Uses os.sendfile on Linux so the copy happens entirely in the kernel
+    with no user-space buffers. On macOS/BSD sendfile only writes to
+    sockets, and elsewhere it doesn't exist, so those platforms use
+    shutil.move, which already picks the fastest copy routine available.
+    """
+    if sys.platform == 'linux':
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            remaining = os.fstat(s.fileno()).st_size
+            offset = 0
+            while remaining > 0:
+                sent = os.sendfile(d.fileno(), s.fileno(), offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        os.unlink(src)
+    else:
+        shutil.move(src, dst)
+
+
 class DatasetFileHandler(FileSystemEventHandler):
     """
     Handles file creation events in the watch folder
     """
-    
+
+    # Number of worker threads draining the event queue
+    NUM_WORKERS = 4
+
+    def __init__(self):
+        super().__init__()
+        # Folders we already know exist - setup_folders() pre-creates
+        # everything, so after warmup no makedirs call is needed per file
+        self._ensured = set()
+
+        # Paths currently queued or being processed - some backends emit
+        # more than one event per file, and duplicates would waste a
+        # readiness wait and a doomed move attempt each
+        self._inflight = set()
+
+        # Events are enqueued by the observer thread and drained by
+        # workers, so waiting and moving never block event dispatch
+        self.queue = queue.Queue()
+        for _ in range(self.NUM_WORKERS):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+
+    def _worker(self):
+        """
+        Drain the event queue: wait for each file to settle, then move it
+        """
+        while True:
+            filepath = self.queue.get()
+            try:
+                if self._wait_until_stable(filepath):
+                    # Derive the name only for files that survive the
+                    # readiness check - one scan vs os.path.basename
+                    filename = filepath.rpartition(os.sep)[2]
+                    self.process_file(filepath, filename)
+            finally:
+                self._inflight.discard(filepath)
+                self.queue.task_done()
+
+
     def on_created(self, event):
         """
         Called when a new file is created in watch folder
@@ -65,21 +171,47 @@ class DatasetFileHandler(FileSystemEventHandler):
         if event.is_directory:
             return
         
-        # Get filename
+        # Drop duplicate events for a path that is already queued
+        # (check+add both happen on the single observer thread)
         filepath = event.src_path
-        filename = os.path.basename(filepath)
-        
-        # Wait a bit to ensure file is fully written
-        time.sleep(0.5)
-        
-        # Check if file still exists (might be temp file)
-        if not os.path.exists(filepath):
+        if filepath in self._inflight:
             return
-        
-        # Process the file
-        self.process_file(filepath, filename)
-    
-    
+        self._inflight.add(filepath)
+
+        # Hand off to a worker thread - the observer thread must stay
+        # free to keep draining the kernel's event queue
+        self.queue.put(filepath)
+
+
+    def _wait_until_stable(self, filepath, interval=0.02, timeout=5.0):
+        """
+        Wait until the file's size stops changing (writer finished)
+
+        Returns True once two size samples taken `interval` apart match,
+        False if the file disappears (temp file) or the timeout expires.
+        A 0-byte file never counts as stable - the extension never
+        produces empty files, so size 0 means the writer hasn't started.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            last_size = os.stat(filepath).st_size
+        except OSError:
+            return False
+
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            try:
+                size = os.stat(filepath).st_size
+            except OSError:
+                return False
+            if size == last_size and size > 0:
+                return True
+            last_size = size
+
+        log.warning(f"⚠️  Timed out waiting for file to finish writing: {filepath}")
+        return False
+
+
     def process_file(self, filepath, filename):
         """
         Parse filename and move to correct destination
@@ -88,56 +220,80 @@ class DatasetFileHandler(FileSystemEventHandler):
         Example: twitter_1730912345678_0347.jpg
         """
         try:
-            # Parse filename
-            parts = filename.split('_')
-            
-            if len(parts) < 3:
-                print(f"⚠️  Invalid filename format: {filename}")
-                return
-            
-            # Extract platform name
-            platform = parts[0].lower()
-            
-            # Validate platform
-            if platform not in PLATFORMS:
-                print(f"⚠️  Unknown platform: {platform}")
-                return
-            
-            # Get file extension
-            extension = os.path.splitext(filename)[1].lower()
-            
-            # Determine destination folder
-            if extension == IMAGE_EXT:
-                dest_folder = os.path.join(DEST_BASE, platform, 'images')
-            elif extension == LABEL_EXT:
-                dest_folder = os.path.join(DEST_BASE, platform, 'labels')
-            else:
-                print(f"⚠️  Unknown file extension: {extension}")
+            # Validate and parse the whole filename in one regex match -
+            # covers platform, timestamp, counter and extension at once
+            m = FILENAME_PAT.match(filename)
+
+            if m is None:
+                log.warning(f"⚠️  Invalid filename format: {filename}")
                 return
+
+            # Already lowercase - the extension controls the filenames
+            platform = m.group(1)
+            extension = m.group(2)  # bare suffix: 'jpg' or 'txt'
+
+            # Look up the precomputed destination folder - the match
+            # guarantees the key exists
+            dest_folder = DEST_DIRS[(platform, extension)]
             
-            # Create destination folder if doesn't exist
-            os.makedirs(dest_folder, exist_ok=True)
+            # Create destination folder if doesn't exist (only once per folder)
+            if dest_folder not in self._ensured:
+                os.makedirs(dest_folder, exist_ok=True)
+                self._ensured.add(dest_folder)
             
             # Build destination path
             dest_path = os.path.join(dest_folder, filename)
             
-            # Check if file already exists
-            if os.path.exists(dest_path):
-                print(f"⚠️  File already exists: {dest_path}")
+            # Claim the destination name atomically instead of a racy
+            # exists() pre-check - filenames encode timestamp+counter,
+            # so collisions are exceptional
+            claimed = False
+            try:
+                fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                claimed = True
+            except FileExistsError:
+                log.warning(f"⚠️  File already exists: {dest_path}")
                 # Add timestamp to make unique
                 base, ext = os.path.splitext(filename)
                 new_filename = f"{base}_dup_{int(time.time())}{ext}"
                 dest_path = os.path.join(dest_folder, new_filename)
             
-            # Move file
-            shutil.move(filepath, dest_path)
+            # Move file - os.replace is a single rename syscall when source
+            # and destination are on the same filesystem (the common case);
+            # fall back to shutil.move only for cross-device moves.
+            # Batching renames through io_uring was considered and rejected:
+            # it needs a Linux-only C extension (python-liburing) and this
+            # script also runs on Windows, where renames stay one syscall
+            # per file anyway.
+            try:
+                try:
+                    os.replace(filepath, dest_path)
+                except OSError as e:
+                    if e.errno == errno.EXDEV:
+                        _move_across_devices(filepath, dest_path)
+                    else:
+                        raise
+            except Exception:
+                # Don't leave our 0-byte placeholder squatting on the
+                # destination name if the move itself failed
+                if claimed:
+                    try:
+                        os.unlink(dest_path)
+                    except OSError:
+                        pass
+                raise
             
+            # Update in-memory statistics
+            with COUNTS_LOCK:
+                COUNTS[platform]['images' if extension == 'jpg' else 'labels'] += 1
+
             # Success message
-            file_type = "Image" if extension == IMAGE_EXT else "Label"
-            print(f"✅ {file_type} moved: {platform}/{filename}")
+            file_type = "Image" if extension == 'jpg' else "Label"
+            log.info(f"✅ {file_type} moved: {platform}/{filename}")
             
         except Exception as e:
-            print(f"❌ Error processing {filename}: {e}")
+            log.error(f"❌ Error processing {filename}: {e}")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -154,14 +310,21 @@ def setup_folders():
     os.makedirs(WATCH_FOLDER, exist_ok=True)
     print(f"   ✅ Watch folder: {WATCH_FOLDER}")
     
-    # Create destination folders for each platform
+    # Create the shared base once, then mkdir each leaf directly so the
+    # common prefix isn't re-stat'ed for all 20 destination folders
+    os.makedirs(DEST_BASE, exist_ok=True)
+
     for platform in PLATFORMS:
-        images_folder = os.path.join(DEST_BASE, platform, 'images')
-        labels_folder = os.path.join(DEST_BASE, platform, 'labels')
-        
-        os.makedirs(images_folder, exist_ok=True)
-        os.makedirs(labels_folder, exist_ok=True)
-        
+        platform_folder = os.path.join(DEST_BASE, platform)
+
+        for folder in (platform_folder,
+                       os.path.join(platform_folder, 'images'),
+                       os.path.join(platform_folder, 'labels')):
+            try:
+                os.mkdir(folder)
+            except FileExistsError:
+                pass
+
         print(f"   ✅ {platform}: images/ and labels/")
     
     print("✅ Folder structure ready!\n")
@@ -171,40 +334,57 @@ def setup_folders():
 # STATISTICS FUNCTION
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def print_statistics():
+def seed_counts():
     """
-    Print current dataset statistics
+    Seed the in-memory counters from the files already on disk
+
+    One scandir pass per folder at startup; after this the counters are
+    maintained incrementally by the handler on every move.
     """
-    print("\n" + "="*60)
-    print("📊 CURRENT DATASET STATISTICS")
-    print("="*60)
-    
-    total_images = 0
-    total_labels = 0
-    
     for platform in PLATFORMS:
         images_folder = os.path.join(DEST_BASE, platform, 'images')
         labels_folder = os.path.join(DEST_BASE, platform, 'labels')
-        
-        # Count files
-        image_count = 0
-        label_count = 0
-        
+
         if os.path.exists(images_folder):
-            image_count = len([f for f in os.listdir(images_folder) if f.endswith(IMAGE_EXT)])
-        
+            with os.scandir(images_folder) as it:
+                COUNTS[platform]['images'] = sum(1 for e in it if e.name.endswith(IMAGE_EXT) and e.is_file(follow_symlinks=False))
+
         if os.path.exists(labels_folder):
-            label_count = len([f for f in os.listdir(labels_folder) if f.endswith(LABEL_EXT)])
-        
-        if image_count > 0 or label_count > 0:
-            print(f"  {platform.upper():12} Images: {image_count:4}  Labels: {label_count:4}")
-        
-        total_images += image_count
-        total_labels += label_count
-    
-    print("-"*60)
-    print(f"  {'TOTAL':12} Images: {total_images:4}  Labels: {total_labels:4}")
-    print("="*60 + "\n")
+            with os.scandir(labels_folder) as it:
+                COUNTS[platform]['labels'] = sum(1 for e in it if e.name.endswith(LABEL_EXT) and e.is_file(follow_symlinks=False))
+
+
+def print_statistics():
+    """
+    Print current dataset statistics (from the in-memory counters)
+    """
+    out = []
+    out.append("")
+    out.append("="*60)
+    out.append("📊 CURRENT DATASET STATISTICS")
+    out.append("="*60)
+
+    total_images = 0
+    total_labels = 0
+
+    with COUNTS_LOCK:
+        for platform in PLATFORMS:
+            image_count = COUNTS[platform]['images']
+            label_count = COUNTS[platform]['labels']
+
+            if image_count > 0 or label_count > 0:
+                out.append(f"  {platform.upper():12} Images: {image_count:4}  Labels: {label_count:4}")
+
+            total_images += image_count
+            total_labels += label_count
+
+    out.append("-"*60)
+    out.append(f"  {'TOTAL':12} Images: {total_images:4}  Labels: {total_labels:4}")
+    out.append("="*60)
+    out.append("")
+
+    # One write call for the whole report instead of a print per line
+    sys.stdout.write('\n'.join(out) + '\n')
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -221,10 +401,14 @@ def main():
     
     # Setup folders
     setup_folders()
-    
-    # Print current statistics
+
+    # Seed counters from disk, then print current statistics
+    seed_counts()
     print_statistics()
     
+    # Start draining log records in the background
+    _log_listener.start()
+
     # Create event handler and observer
     event_handler = DatasetFileHandler()
     observer = Observer()
@@ -238,15 +422,30 @@ def main():
     print(f"📤 Organizing to: {DEST_BASE}/{{platform}}/{{images|labels}}/\n")
     print("Press Ctrl+C to stop\n")
     
+    # Wait on the observer instead of a 1s wakeup loop. On POSIX a bare
+    # join blocks with zero wakeups and Ctrl+C interrupts it; on Windows
+    # an untimed join waits without the SIGINT event and would hang, so
+    # use watchdog's timed-join pattern there (one wakeup per second,
+    # same as the old loop, but only on Windows)
     try:
-        while True:
-            time.sleep(1)
+        if os.name == 'nt':
+            while observer.is_alive():
+                observer.join(1)
+        else:
+            observer.join()
     except KeyboardInterrupt:
         print("\n\n⏹️  Stopping file organizer...")
         observer.stop()
-    
+
     observer.join()
-    
+
+    # Let the workers finish every move already queued - the daemon
+    # threads would otherwise die with files stranded in the watch folder
+    event_handler.queue.join()
+
+    # Flush any queued log records before the final report
+    _log_listener.stop()
+
     # Print final statistics
     print_statistics()
     